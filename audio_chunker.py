@@ -1,11 +1,146 @@
 import argparse
+import json
 from pathlib import Path
 import subprocess
 import librosa
+import numpy as np
 import soundfile as sf
+from ffmpeg_path import get_ffmpeg_path
 
 
-def chunk_audio(input_file: Path, output_dir: Path, chunk_duration_minutes: int = 10, overlap_minutes: int = 1):
+TIME_MAP_FILE = "time_map.json"
+
+
+def find_voiced_intervals(audio, sr: int, top_db: float = 40, min_silence_sec: float = 1.0, padding_sec: float = 0.25):
+    """
+    Znajduje fragmenty z dźwiękiem (wszystko poza dłuższą ciszą).
+    
+    Analiza energii jest wektorowa (librosa.effects.split). Przerwy krótsze
+    niż min_silence_sec są zostawiane, a każdy fragment dostaje margines
+    padding_sec, żeby nie ucinać początków i końców słów.
+    
+    Returns:
+        Lista par [start_sample, end_sample]
+    """
+    intervals = librosa.effects.split(audio, top_db=top_db, frame_length=2048, hop_length=512)
+    if len(intervals) == 0:
+        return []
+    
+    padding = int(padding_sec * sr)
+    min_gap = int(min_silence_sec * sr)
+    
+    starts = np.maximum(intervals[:, 0] - padding, 0)
+    ends = np.minimum(intervals[:, 1] + padding, len(audio))
+    
+    # Łączymy fragmenty, między którymi cisza jest za krótka do wycięcia
+    keep_gap = starts[1:] - ends[:-1] >= min_gap
+    seg_starts = np.concatenate(([starts[0]], starts[1:][keep_gap]))
+    seg_ends = np.concatenate((ends[:-1][keep_gap], [ends[-1]]))
+    
+    return [[int(a), int(b)] for a, b in zip(seg_starts, seg_ends)]
+
+
+def compact_silence(audio, sr: int, top_db: float = 40, min_silence_sec: float = 1.0, padding_sec: float = 0.25):
+    """
+    Wycina długie fragmenty ciszy z audio.
+    
+    Returns:
+        (skompaktowane audio, mapa czasu). Mapa czasu to lista punktów
+        [compact_ms, original_ms] - od danego punktu do następnego czas
+        skompaktowany przesuwa się 1:1 względem oryginalnego.
+    """
+    intervals = find_voiced_intervals(audio, sr, top_db, min_silence_sec, padding_sec)
+    if not intervals:
+        # Sama cisza albo pusty plik - zostawiamy audio bez zmian
+        return audio, [[0, 0]]
+    
+    compacted = np.concatenate([audio[start:end] for start, end in intervals])
+    
+    segments = []
+    compact_sample = 0
+    for start, end in intervals:
+        segments.append([round(compact_sample * 1000 / sr), round(start * 1000 / sr)])
+        compact_sample += end - start
+    
+    return compacted, segments
+
+
+def write_time_map(output_dir: Path, segments, sr: int, original_samples: int, compacted_samples: int) -> Path:
+    """Zapisuje mapę czasu (skompaktowany -> oryginalny) obok chunków"""
+    time_map_file = output_dir / TIME_MAP_FILE
+    with open(time_map_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            "sample_rate": sr,
+            "original_ms": round(original_samples * 1000 / sr),
+            "compacted_ms": round(compacted_samples * 1000 / sr),
+            "segments": segments,
+        }, f)
+    return time_map_file
+
+
+def plan_chunks(total_samples: int, sr: int, chunk_duration_minutes: float = 10, overlap_minutes: float = 1):
+    """
+    Wylicza granice chunków (w próbkach) bez dotykania samego audio.
+    
+    Returns:
+        Lista tupli (chunk_number, start_sample, end_sample), numeracja od 1
+    """
+    # Konwertujemy minuty na próbki (samples)
+    chunk_samples = int(chunk_duration_minutes * 60 * sr)
+    overlap_samples = int(overlap_minutes * 60 * sr)
+    
+    # Krok między startami chunków (chunk - overlap)
+    step_samples = chunk_samples - overlap_samples
+    if step_samples <= 0:
+        raise ValueError("Nakładanie musi być krótsze niż długość chunku")
+    
+    chunks = []
+    chunk_number = 1
+    start_sample = 0
+    
+    while start_sample < total_samples:
+        end_sample = min(start_sample + chunk_samples, total_samples)
+        chunks.append((chunk_number, start_sample, end_sample))
+        
+        # Jeśli doszliśmy do końca, przerywamy
+        if end_sample >= total_samples:
+            break
+        
+        # Przesuwamy się do następnego chunku
+        start_sample += step_samples
+        chunk_number += 1
+    
+    return chunks
+
+
+def chunk_file_name(chunk_number: int, start_sample: int, end_sample: int, sr: int) -> str:
+    """Nazwa pliku chunku, np. chunk_002_009-019min.mp4"""
+    start_min = int(start_sample / (sr * 60))
+    end_min = int(end_sample / (sr * 60))
+    return f"chunk_{chunk_number:03d}_{start_min:03d}-{end_min:03d}min.mp4"
+
+
+def encode_range(input_file: Path, output_file: Path, start_sample: int, end_sample: int, sr: int,
+                 ffmpeg: str = None):
+    """
+    Koduje fragment [start_sample, end_sample) pliku wejściowego do MP4 (AAC).
+    
+    Używa seekowania po wejściu (-ss/-t przed -i), więc ffmpeg dekoduje tylko
+    ten zakres zamiast całego pliku. Wyjście jest mono w oryginalnym sample
+    rate, tak jak chunki z chunk_audio.
+    """
+    subprocess.run(
+        [ffmpeg or get_ffmpeg_path(), "-ss", f"{start_sample / sr:.6f}", "-t", f"{(end_sample - start_sample) / sr:.6f}",
+         "-i", str(input_file), "-vn", "-ac", "1", "-ar", str(sr),
+         "-q:a", "5", "-c:a", "aac", "-y", str(output_file)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=True
+    )
+
+
+def chunk_audio(input_file: Path, output_dir: Path, chunk_duration_minutes: int = 10, overlap_minutes: int = 1,
+                remove_silence: bool = False):
     """
     Dzieli plik audio na chunki z nakładaniem.
     
@@ -14,6 +149,7 @@ def chunk_audio(input_file: Path, output_dir: Path, chunk_duration_minutes: int
         output_dir: Folder docelowy na chunki (zawsze MP4)
         chunk_duration_minutes: Długość każdego chunku w minutach (domyślnie 10)
         overlap_minutes: Długość nakładania w minutach (domyślnie 1)
+        remove_silence: Wytnij długą ciszę przed podziałem i zapisz time_map.json
     """
     
     # Tworzymy folder na wyjście
@@ -31,31 +167,27 @@ def chunk_audio(input_file: Path, output_dir: Path, chunk_duration_minutes: int
     print(f"Całkowita długość: {total_duration_min:.2f} minut ({total_duration_sec:.1f}s)")
     print(f"Sample rate: {sr} Hz\n")
     
-    # Konwertujemy minuty na próbki (samples)
-    chunk_samples = int(chunk_duration_minutes * 60 * sr)
-    overlap_samples = int(overlap_minutes * 60 * sr)
+    if remove_silence:
+        original_samples = total_samples
+        audio, segments = compact_silence(audio, sr)
+        total_samples = len(audio)
+        time_map_file = write_time_map(output_dir, segments, sr, original_samples, total_samples)
+        removed_min = (original_samples - total_samples) / (sr * 60)
+        print(f"Usunięto ciszę: {removed_min:.2f} minut (po kompaktowaniu: {total_samples / (sr * 60):.2f} minut)")
+        print(f"Mapa czasu: {time_map_file}\n")
     
-    # Krok między startami chunków (chunk - overlap)
-    step_samples = chunk_samples - overlap_samples
-    
-    chunk_number = 1
-    start_sample = 0
+    chunks = plan_chunks(total_samples, sr, chunk_duration_minutes, overlap_minutes)
     
     # Najpierw zapisujemy chunki jako WAV (szybko), potem konwertujemy do MP3
     temp_dir = output_dir / ".temp_wav"
     temp_dir.mkdir(parents=True, exist_ok=True)
     
-    while start_sample < total_samples:
-        end_sample = min(start_sample + chunk_samples, total_samples)
-        
+    for chunk_number, start_sample, end_sample in chunks:
         # Wyciągamy chunk
         chunk = audio[start_sample:end_sample]
         
-        # Tworzymy nazwę pliku
-        start_min = int(start_sample / (sr * 60))
-        end_min = int(end_sample / (sr * 60))
         temp_file = temp_dir / f"chunk_{chunk_number:03d}.wav"
-        output_file = output_dir / f"chunk_{chunk_number:03d}_{start_min:03d}-{end_min:03d}min.mp4"
+        output_file = output_dir / chunk_file_name(chunk_number, start_sample, end_sample, sr)
         
         # Zapisujemy tymczasowy WAV
         sf.write(str(temp_file), chunk, sr)
@@ -73,20 +205,12 @@ def chunk_audio(input_file: Path, output_dir: Path, chunk_duration_minutes: int
         except subprocess.CalledProcessError as e:
             print(f"❌ Błąd konwersji: {output_file}")
             return
-        
-        # Jeśli doszliśmy do końca, przerywamy
-        if end_sample >= total_samples:
-            break
-        
-        # Przesuwamy się do następnego chunku
-        start_sample += step_samples
-        chunk_number += 1
     
     # Usuwamy folder tymczasowy
     import shutil
     shutil.rmtree(temp_dir)
     
-    print(f"\nGotowe! Stworzono {chunk_number} chunków w folderze: {output_dir}")
+    print(f"\nGotowe! Stworzono {len(chunks)} chunków w folderze: {output_dir}")
 
 
 def main():
@@ -95,6 +219,8 @@ def main():
     p.add_argument("-o", "--out", default="chunks", help="Folder docelowy (domyślnie: chunks)")
     p.add_argument("-d", "--duration", type=int, default=10, help="Długość chunku w minutach (domyślnie: 10)")
     p.add_argument("-ov", "--overlap", type=int, default=1, help="Nakładanie w minutach (domyślnie: 1)")
+    p.add_argument("-s", "--remove-silence", action="store_true",
+                   help=f"Wytnij długą ciszę przed podziałem (zapisuje {TIME_MAP_FILE} dla SRT Mergera)")
     
     args = p.parse_args()
     
@@ -105,7 +231,7 @@ def main():
         print(f"❌ Plik nie istnieje: {input_path}")
         exit(1)
     
-    chunk_audio(input_path, output_path, args.duration, args.overlap)
+    chunk_audio(input_path, output_path, args.duration, args.overlap, args.remove_silence)
 
 
 if __name__ == "__main__":
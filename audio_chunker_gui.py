@@ -1,65 +1,91 @@
 import sys
 import os
 from pathlib import Path
-from threading import Thread
+from threading import Thread, Lock
+from collections import namedtuple
 import subprocess
 import librosa
 import soundfile as sf
 from srt_merger import merge_srt_files
-
-# Szukaj ffmpeg w folderze aplikacji
-def get_ffmpeg_path():
-    """Szuka ffmpeg w folderze aplikacji (dla embedded wersji)"""
-    if getattr(sys, 'frozen', False):
-        # PyInstaller bundle
-        base_path = sys._MEIPASS
-    else:
-        # Development
-        base_path = os.path.dirname(os.path.abspath(__file__))
-    
-    ffmpeg_path = os.path.join(base_path, 'ffmpeg', 'bin', 'ffmpeg.exe')
-    if os.path.exists(ffmpeg_path):
-        return ffmpeg_path
-    
-    # Fallback na system PATH
-    return 'ffmpeg'
+from audio_chunker import compact_silence, write_time_map, plan_chunks, chunk_file_name
+from media_catalog import MediaCatalog
+from ffmpeg_path import get_ffmpeg_path
 
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QLineEdit, QPushButton, QSpinBox, QTextEdit, QFileDialog,
     QProgressBar, QGroupBox, QFormLayout, QTabWidget, QListWidget,
-    QListWidgetItem
+    QListWidgetItem, QCheckBox
 )
-from PyQt5.QtCore import Qt, pyqtSignal, QObject, QThread
+from PyQt5.QtCore import Qt, pyqtSignal, QObject, QThread, QTimer
 from PyQt5.QtGui import QFont
 
 
+# Ile linii trzyma okno logu (starsze są usuwane)
+LOG_MAX_LINES = 1000
+
+# Jak często GUI odbiera zdarzenia postępu od workera (ms, ~30 klatek/s)
+PROGRESS_FLUSH_MS = 33
+
+
+# Zdarzenie postępu: message (linia logu) i/lub percent (pasek postępu), drugie pole może być None
+ProgressEvent = namedtuple('ProgressEvent', ['message', 'percent'])
+
+
+class ProgressChannel:
+    """
+    Bufor zdarzeń postępu między wątkiem workera a GUI.
+    
+    Worker tylko dopisuje zdarzenia do listy (bez sygnałów Qt), a GUI
+    odbiera je paczkami z timera, więc liczba zdarzeń nie obciąża pętli
+    zdarzeń Qt ani samego workera.
+    """
+    
+    def __init__(self):
+        self.lock = Lock()
+        self.events = []
+    
+    def put(self, event):
+        with self.lock:
+            self.events.append(event)
+    
+    def drain(self):
+        with self.lock:
+            events, self.events = self.events, []
+        return events
+
+
 class ChunkerWorker(QObject):
-    progress = pyqtSignal(str)
-    progress_percent = pyqtSignal(int)
     finished = pyqtSignal(bool)
     
-    def __init__(self, input_file, output_dir, chunk_duration, overlap):
+    def __init__(self, input_file, output_dir, chunk_duration, overlap, remove_silence=False, channel=None):
+        """channel=None - tryb bez GUI, zdarzenia postępu nie są nigdzie zbierane"""
         super().__init__()
         self.input_file = input_file
         self.output_dir = output_dir
         self.chunk_duration = chunk_duration
         self.overlap = overlap
+        self.remove_silence = remove_silence
+        self.channel = channel
         self.cancelled = False
     
     def cancel(self):
         self.cancelled = True
     
+    def report(self, message=None, percent=None):
+        if self.channel is not None:
+            self.channel.put(ProgressEvent(message, percent))
+    
     def run(self):
         try:
             self.chunk_audio()
             if not self.cancelled:
                 self.finished.emit(True)
             else:
-                self.progress.emit("❌ Anulowano przez użytkownika")
+                self.report("❌ Anulowano przez użytkownika")
                 self.finished.emit(False)
         except Exception as e:
-            self.progress.emit(f"❌ Błąd: {str(e)}")
+            self.report(f"❌ Błąd: {str(e)}")
             self.finished.emit(False)
     
     def chunk_audio(self):
@@ -67,7 +93,7 @@ class ChunkerWorker(QObject):
         output_path = Path(self.output_dir)
         
         output_path.mkdir(parents=True, exist_ok=True)
-        self.progress.emit(f"Ładowanie pliku: {input_path.name}")
+        self.report(f"Ładowanie pliku: {input_path.name}")
         
         if self.cancelled:
             return
@@ -79,45 +105,39 @@ class ChunkerWorker(QObject):
         total_duration_sec = total_samples / sr
         total_duration_min = total_duration_sec / 60
         
-        self.progress.emit(f"Całkowita długość: {total_duration_min:.2f} minut")
-        self.progress.emit(f"Sample rate: {sr} Hz\n")
+        self.report(f"Całkowita długość: {total_duration_min:.2f} minut")
+        self.report(f"Sample rate: {sr} Hz\n")
         
-        chunk_samples = int(self.chunk_duration * 60 * sr)
-        overlap_samples = int(self.overlap * 60 * sr)
-        step_samples = chunk_samples - overlap_samples
+        if self.remove_silence:
+            original_samples = total_samples
+            audio, segments = compact_silence(audio, sr)
+            total_samples = len(audio)
+            time_map_file = write_time_map(output_path, segments, sr, original_samples, total_samples)
+            removed_min = (original_samples - total_samples) / (sr * 60)
+            self.report(f"Usunięto ciszę: {removed_min:.2f} minut")
+            self.report(f"Mapa czasu: {time_map_file.name}\n")
         
-        # Oblicz liczbę chunków
-        chunk_number = 1
-        start_sample = 0
-        total_chunks = 0
+        if self.cancelled:
+            return
         
-        # Najpierw policz ile będzie chunków
-        temp_start = 0
-        while temp_start < total_samples:
-            total_chunks += 1
-            temp_end = min(temp_start + chunk_samples, total_samples)
-            if temp_end >= total_samples:
-                break
-            temp_start += step_samples
+        chunks = plan_chunks(total_samples, sr, self.chunk_duration, self.overlap)
+        total_chunks = len(chunks)
         
-        self.progress.emit(f"Przewidywanych chunków: {total_chunks}")
+        self.report(f"Przewidywanych chunków: {total_chunks}")
         
         temp_dir = output_path / ".temp_wav"
         temp_dir.mkdir(parents=True, exist_ok=True)
         
-        while start_sample < total_samples:
+        for chunk_number, start_sample, end_sample in chunks:
             if self.cancelled:
                 import shutil
                 shutil.rmtree(temp_dir)
                 return
             
-            end_sample = min(start_sample + chunk_samples, total_samples)
             chunk = audio[start_sample:end_sample]
             
-            start_min = int(start_sample / (sr * 60))
-            end_min = int(end_sample / (sr * 60))
             temp_file = temp_dir / f"chunk_{chunk_number:03d}.wav"
-            output_file = output_path / f"chunk_{chunk_number:03d}_{start_min:03d}-{end_min:03d}min.mp4"
+            output_file = output_path / chunk_file_name(chunk_number, start_sample, end_sample, sr)
             
             sf.write(str(temp_file), chunk, sr)
             
@@ -131,28 +151,22 @@ class ChunkerWorker(QObject):
                     creationflags=0x08000000 if sys.platform == 'win32' else 0
                 )
                 duration_chunk = len(chunk) / (sr * 60)
-                self.progress.emit(f"✓ {output_file.name} ({duration_chunk:.2f} min)")
+                self.report(f"✓ {output_file.name} ({duration_chunk:.2f} min)")
                 
                 # Aktualizuj progress bar (cap na 100%)
                 percent = int((chunk_number / total_chunks) * 100) if total_chunks > 0 else 0
                 percent = min(percent, 100)  # Nie przekraczaj 100%
-                self.progress_percent.emit(percent)
+                self.report(percent=percent)
                 
             except subprocess.CalledProcessError as e:
-                self.progress.emit(f"❌ Błąd konwersji: {output_file}")
+                self.report(f"❌ Błąd konwersji: {output_file}")
                 raise
-            
-            if end_sample >= total_samples:
-                break
-            
-            start_sample += step_samples
-            chunk_number += 1
         
         import shutil
         shutil.rmtree(temp_dir)
         
-        self.progress_percent.emit(100)
-        self.progress.emit(f"\n✅ Gotowe! Stworzono {chunk_number} chunków")
+        self.report(percent=100)
+        self.report(f"\n✅ Gotowe! Stworzono {total_chunks} chunków")
 
 
 
@@ -216,6 +230,15 @@ class SRTMergerTab(QWidget):
         self.overlap_spin.setSuffix(" minut")
         params_layout.addRow("Nakładanie:", self.overlap_spin)
         
+        self.time_map_line = QLineEdit()
+        self.time_map_line.setPlaceholderText("(opcjonalnie) time_map.json z usuniętą ciszą")
+        time_map_btn = QPushButton("Wybierz...")
+        time_map_btn.clicked.connect(self.select_time_map)
+        time_map_layout = QHBoxLayout()
+        time_map_layout.addWidget(self.time_map_line)
+        time_map_layout.addWidget(time_map_btn)
+        params_layout.addRow("Mapa czasu:", time_map_layout)
+        
         params_group.setLayout(params_layout)
         main_layout.addWidget(params_group)
         
@@ -252,6 +275,7 @@ class SRTMergerTab(QWidget):
         self.log_text.setReadOnly(True)
         self.log_text.setFont(QFont("Courier", 9))
         self.log_text.setMaximumHeight(200)
+        self.log_text.document().setMaximumBlockCount(LOG_MAX_LINES)
         main_layout.addWidget(self.log_text)
         
         main_layout.addStretch()
@@ -266,6 +290,13 @@ class SRTMergerTab(QWidget):
             self.srt_files.append((file_path, chunk_dur, overlap))
             self.update_file_list()
     
+    def select_time_map(self):
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Wybierz mapę czasu", "", "Time map (*.json);;All files (*)"
+        )
+        if file_path:
+            self.time_map_line.setText(file_path)
+    
     def remove_srt_file(self):
         current_row = self.file_list.currentRow()
         if current_row >= 0:
@@ -317,7 +348,7 @@ class SRTMergerTab(QWidget):
         self.log("Scalanie transkrypcji...")
         
         try:
-            result = merge_srt_files(self.srt_files, output_file)
+            result = merge_srt_files(self.srt_files, output_file, self.time_map_line.text() or None)
             self.log(result)
         except Exception as e:
             self.log(f"❌ Błąd: {str(e)}")
@@ -336,6 +367,10 @@ class AudioChunkerGUI(QMainWindow):
         self.setGeometry(100, 100, 800, 700)
         self.worker_thread = None
         self.worker = None
+        self.progress_channel = ProgressChannel()
+        self.progress_timer = QTimer(self)
+        self.progress_timer.setInterval(PROGRESS_FLUSH_MS)
+        self.progress_timer.timeout.connect(self.flush_progress)
         self.init_ui()
     
     def init_ui(self):
@@ -389,6 +424,9 @@ class AudioChunkerGUI(QMainWindow):
         self.overlap_spin.setSuffix(" minut")
         params_layout.addRow("Nakładanie:", self.overlap_spin)
         
+        self.silence_check = QCheckBox("Usuń ciszę przed podziałem (zapisuje time_map.json)")
+        params_layout.addRow("", self.silence_check)
+        
         params_group.setLayout(params_layout)
         chunker_layout.addWidget(params_group)
         
@@ -457,6 +495,7 @@ class AudioChunkerGUI(QMainWindow):
         self.log_text.setReadOnly(True)
         self.log_text.setFont(QFont("Courier", 9))
         self.log_text.setMaximumHeight(200)
+        self.log_text.document().setMaximumBlockCount(LOG_MAX_LINES)
         chunker_layout.addWidget(self.log_text)
         
         chunker_layout.addStretch()
@@ -471,6 +510,22 @@ class AudioChunkerGUI(QMainWindow):
         )
         if file_path:
             self.input_line.setText(file_path)
+            self.show_media_info(file_path)
+    
+    def show_media_info(self, file_path):
+        """Pokazuje długość i liczbę chunków z katalogu mediów (bez ładowania audio)"""
+        try:
+            catalog = MediaCatalog(ffprobe=get_ffmpeg_path('ffprobe'))
+            try:
+                info = catalog.lookup(file_path, self.chunk_spin.value(), self.overlap_spin.value())
+            finally:
+                catalog.close()
+        except Exception as e:
+            self.log(f"⚠️ Brak metadanych pliku: {str(e)}")
+            return
+        
+        self.log(f"{Path(file_path).name}: {info['duration'] / 60:.2f} minut, {info['sample_rate']} Hz, "
+                 f"przewidywanych chunków: {info['expected_chunks']}")
     
     def select_output_folder(self):
         folder_path = QFileDialog.getExistingDirectory(self, "Wybierz folder docelowy")
@@ -495,15 +550,18 @@ class AudioChunkerGUI(QMainWindow):
         self.start_btn.setEnabled(False)
         self.cancel_btn.setEnabled(True)
         
-        self.worker = ChunkerWorker(input_file, output_dir, self.chunk_spin.value(), self.overlap_spin.value())
+        self.progress_channel.drain()  # Odrzuć zdarzenia z poprzedniego uruchomienia
+        self.worker = ChunkerWorker(
+            input_file, output_dir, self.chunk_spin.value(), self.overlap_spin.value(),
+            self.silence_check.isChecked(), self.progress_channel
+        )
         self.worker_thread = QThread()
         self.worker.moveToThread(self.worker_thread)
         
         self.worker_thread.started.connect(self.worker.run)
-        self.worker.progress.connect(self.log)
-        self.worker.progress_percent.connect(self.progress_bar.setValue)
         self.worker.finished.connect(self.on_chunking_finished)
         
+        self.progress_timer.start()
         self.worker_thread.start()
     
     def cancel_chunking(self):
@@ -512,7 +570,23 @@ class AudioChunkerGUI(QMainWindow):
             self.worker.cancel()
             self.cancel_btn.setEnabled(False)
     
+    def flush_progress(self):
+        """Wyświetla zebrane zdarzenia postępu naraz - jeden wpis do logu i jedno przewinięcie na klatkę"""
+        events = self.progress_channel.drain()
+        if not events:
+            return
+        
+        messages = [event.message for event in events if event.message is not None]
+        if messages:
+            self.log('\n'.join(messages))
+        
+        percents = [event.percent for event in events if event.percent is not None]
+        if percents:
+            self.progress_bar.setValue(percents[-1])
+    
     def on_chunking_finished(self, success):
+        self.progress_timer.stop()
+        self.flush_progress()
         self.start_btn.setEnabled(True)
         self.cancel_btn.setEnabled(False)
         self.progress_bar.setVisible(False)
@@ -0,0 +1,267 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from audio_chunker import plan_chunks, chunk_file_name, encode_range
+from media_catalog import probe_audio
+
+
+class ChunkCache:
+    """
+    Cache LRU wygenerowanych chunków ograniczony rozmiarem na dysku.
+
+    Chunk jest kodowany przy pierwszym żądaniu; przy przekroczeniu limitu
+    usuwane są najdawniej używane pliki. Każde kodowanie trafia do własnego,
+    unikalnego pliku, więc opóźnione usunięcie starej wersji (czytanej
+    jeszcze przez inny wątek) nigdy nie dotknie nowszej. Pod blokadą
+    aktualizowana jest tylko kolejność LRU - pliki są czytane poza nią.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # name -> (plik w cache, rozmiar w bajtach)
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.building = {}  # name -> Lock, żeby ten sam chunk nie był kodowany dwa razy
+        self.readers = {}  # plik -> liczba trwających odczytów
+        self.pending_delete = set()  # pliki usunięte z cache, ale jeszcze czytane
+
+    def get(self, name: str, build) -> bytes:
+        """Zwraca zawartość chunku, generując go przez build(path) jeśli trzeba"""
+        with self.lock:
+            cached_file = self._acquire_cached(name)
+            if cached_file is None:
+                build_lock = self.building.setdefault(name, threading.Lock())
+        if cached_file is not None:
+            return self._read(cached_file)
+
+        with build_lock:
+            with self.lock:
+                cached_file = self._acquire_cached(name)
+            if cached_file is not None:
+                return self._read(cached_file)
+
+            fd, temp_name = tempfile.mkstemp(dir=self.cache_dir, prefix=Path(name).stem + ".", suffix=".mp4")
+            os.close(fd)
+            cached_file = Path(temp_name)
+            try:
+                build(cached_file)
+                size = cached_file.stat().st_size
+            except BaseException:
+                self._unlink(cached_file)
+                raise
+
+            with self.lock:
+                if name in self.entries:
+                    old_file, old_size = self.entries.pop(name)
+                    self.total_bytes -= old_size
+                    self._retire(old_file)
+                self.entries[name] = (cached_file, size)
+                self.total_bytes += size
+                self.readers[cached_file] = self.readers.get(cached_file, 0) + 1
+                self._evict(keep=name)
+        return self._read(cached_file)
+
+    def _acquire_cached(self, name: str):
+        """Wywoływane pod blokadą: odświeża pozycję LRU i rejestruje odczyt"""
+        if name not in self.entries:
+            return None
+        self.entries.move_to_end(name)
+        cached_file = self.entries[name][0]
+        self.readers[cached_file] = self.readers.get(cached_file, 0) + 1
+        return cached_file
+
+    def _read(self, cached_file: Path) -> bytes:
+        try:
+            return cached_file.read_bytes()
+        finally:
+            with self.lock:
+                self.readers[cached_file] -= 1
+                if self.readers[cached_file] == 0:
+                    del self.readers[cached_file]
+                    if cached_file in self.pending_delete:
+                        self.pending_delete.discard(cached_file)
+                        self._unlink(cached_file)
+
+    def _evict(self, keep: str):
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            name, (cached_file, size) = next(iter(self.entries.items()))
+            if name == keep:
+                break
+            del self.entries[name]
+            self.total_bytes -= size
+            self._retire(cached_file)
+
+    def _retire(self, cached_file: Path):
+        """Usuwa plik od razu albo po zakończeniu trwających odczytów"""
+        if cached_file in self.readers:
+            self.pending_delete.add(cached_file)
+        else:
+            self._unlink(cached_file)
+
+    @staticmethod
+    def _unlink(cached_file: Path):
+        try:
+            cached_file.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class ChunkRequestHandler(BaseHTTPRequestHandler):
+    server_version = "MediaProcessorChunkServer"
+
+    def do_GET(self):
+        server = self.server
+        name = self.path.split('?', 1)[0].lstrip('/')
+
+        if name in ("", "chunks.json"):
+            body = json.dumps(server.listing, ensure_ascii=False, indent=1).encode('utf-8')
+            self._send(200, body, "application/json; charset=utf-8")
+            return
+
+        chunk = server.chunks.get(name)
+        if chunk is None:
+            self.send_error(404, None, "Nie ma takiego chunku")
+            return
+
+        number, start_sample, end_sample = chunk
+        try:
+            data = server.cache.get(
+                name,
+                lambda path: encode_range(server.input_file, path, start_sample, end_sample, server.sr, server.ffmpeg)
+            )
+        except (subprocess.CalledProcessError, OSError):
+            # Opis po polsku idzie w treść odpowiedzi - linia statusu HTTP musi być w latin-1
+            self.send_error(500, None, "Błąd konwersji")
+            return
+
+        # Obsługa pojedynczego zakresu bajtów (odtwarzacze i klienci HTTP często go używają)
+        match = re.match(r'bytes=(\d*)-(\d*)$', self.headers.get("Range", ""))
+        if match and (match.group(1) or match.group(2)):
+            first, last = match.groups()
+            if first:
+                first, last = int(first), min(int(last) if last else len(data) - 1, len(data) - 1)
+            else:
+                first, last = max(len(data) - int(last), 0), len(data) - 1
+            if first > last:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.end_headers()
+                return
+            self._send(206, data[first:last + 1], "audio/mp4",
+                       {"Content-Range": f"bytes {first}-{last}/{len(data)}"})
+            return
+
+        self._send(200, data, "audio/mp4")
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Accept-Ranges", "bytes")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        print(f"[{self.address_string()}] {format % args}")
+
+
+class ChunkServer(ThreadingHTTPServer):
+    """Serwer chunków; tymczasowy folder cache (jeśli go utworzył) usuwa przy zamknięciu"""
+
+    temp_cache_dir = None
+
+    def server_close(self):
+        super().server_close()
+        if self.temp_cache_dir is not None:
+            self.temp_cache_dir.cleanup()
+            self.temp_cache_dir = None
+
+
+def create_chunk_server(input_file: Path, chunk_duration_minutes: int = 10, overlap_minutes: int = 1,
+                        port: int = 8765, cache_dir: Path = None, cache_mb: int = 512,
+                        ffmpeg: str = None) -> ChunkServer:
+    """
+    Tworzy serwer HTTP (tylko localhost) z wirtualnymi chunkami.
+
+    Lista pod /chunks.json ma te same nazwy i zakresy co chunk_audio, ale
+    plik MP4 powstaje dopiero przy pierwszym GET /<nazwa>. Bez cache_dir
+    chunki trafiają do folderu tymczasowego usuwanego w server_close().
+    """
+    total_samples, sr = probe_audio(input_file, chunk_duration_minutes, overlap_minutes)
+    chunks = plan_chunks(total_samples, sr, chunk_duration_minutes, overlap_minutes)
+
+    server = ChunkServer(("127.0.0.1", port), ChunkRequestHandler)
+    if cache_dir is None:
+        server.temp_cache_dir = tempfile.TemporaryDirectory(prefix="chunk_cache_")
+        cache_dir = Path(server.temp_cache_dir.name)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    server.input_file = Path(input_file)
+    server.sr = sr
+    server.ffmpeg = ffmpeg
+    server.cache = ChunkCache(cache_dir, cache_mb * 1024 * 1024)
+    server.chunks = {}
+    server.listing = []
+
+    for number, start_sample, end_sample in chunks:
+        name = chunk_file_name(number, start_sample, end_sample, sr)
+        server.chunks[name] = (number, start_sample, end_sample)
+        server.listing.append({
+            "number": number,
+            "file": name,
+            "start_sample": start_sample,
+            "end_sample": end_sample,
+            "start_sec": start_sample / sr,
+            "end_sec": end_sample / sr,
+            "url": f"http://127.0.0.1:{server.server_address[1]}/{name}",
+        })
+
+    return server
+
+
+def main():
+    p = argparse.ArgumentParser(description="Wirtualne chunki na żądanie przez lokalny serwer HTTP")
+    p.add_argument("input_file", help="Ścieżka do pliku audio (MP3 lub MP4)")
+    p.add_argument("-d", "--duration", type=int, default=10, help="Długość chunku w minutach (domyślnie: 10)")
+    p.add_argument("-ov", "--overlap", type=int, default=1, help="Nakładanie w minutach (domyślnie: 1)")
+    p.add_argument("-p", "--port", type=int, default=8765, help="Port na localhost (domyślnie: 8765)")
+    p.add_argument("--cache-dir", default=None, help="Folder cache (domyślnie: tymczasowy)")
+    p.add_argument("--cache-mb", type=int, default=512, help="Maksymalny rozmiar cache w MB (domyślnie: 512)")
+
+    args = p.parse_args()
+
+    input_path = Path(args.input_file)
+    if not input_path.exists():
+        print(f"❌ Plik nie istnieje: {input_path}")
+        exit(1)
+
+    cache_dir = Path(args.cache_dir) if args.cache_dir else None
+    try:
+        server = create_chunk_server(input_path, args.duration, args.overlap, args.port, cache_dir, args.cache_mb)
+    except (RuntimeError, ValueError) as e:
+        print(f"❌ {e}")
+        exit(1)
+    host, port = server.server_address[:2]
+    print(f"Chunków: {len(server.listing)}, lista: http://{host}:{port}/chunks.json")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
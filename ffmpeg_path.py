@@ -0,0 +1,20 @@
+import sys
+import os
+
+
+# Szukaj ffmpeg w folderze aplikacji
+def get_ffmpeg_path(tool='ffmpeg'):
+    """Szuka ffmpeg (lub ffprobe) w folderze aplikacji (dla embedded wersji)"""
+    if getattr(sys, 'frozen', False):
+        # PyInstaller bundle
+        base_path = sys._MEIPASS
+    else:
+        # Development
+        base_path = os.path.dirname(os.path.abspath(__file__))
+    
+    ffmpeg_path = os.path.join(base_path, 'ffmpeg', 'bin', f'{tool}.exe')
+    if os.path.exists(ffmpeg_path):
+        return ffmpeg_path
+    
+    # Fallback na system PATH
+    return tool
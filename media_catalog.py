@@ -0,0 +1,262 @@
+import argparse
+import hashlib
+import json
+import math
+import sqlite3
+import subprocess
+import time
+from pathlib import Path
+
+from ffmpeg_path import get_ffmpeg_path
+
+
+DEFAULT_DB = Path.home() / ".media_processor" / "catalog.db"
+MEDIA_EXTENSIONS = {".mp3", ".mp4", ".m4a", ".wav", ".flac"}
+
+# Ile sekund audio przetwarzamy na sekundę pracy (dekodowanie + AAC) - do szacunków
+DEFAULT_SPEED = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    duration REAL NOT NULL,
+    codec TEXT,
+    sample_rate INTEGER NOT NULL,
+    channels INTEGER,
+    chunk_duration INTEGER NOT NULL,
+    overlap INTEGER NOT NULL,
+    expected_chunks INTEGER NOT NULL,
+    probed_at REAL NOT NULL
+)
+"""
+
+
+def expected_chunk_count(total_samples: int, sr: int, chunk_duration_minutes: float = 10,
+                         overlap_minutes: float = 1) -> int:
+    """
+    Liczba chunków bez budowania całej listy - ta sama arytmetyka co
+    audio_chunker.plan_chunks, ale bez importu librosa (szybkie zapytania).
+    """
+    chunk_samples = int(chunk_duration_minutes * 60 * sr)
+    step_samples = chunk_samples - int(overlap_minutes * 60 * sr)
+    if step_samples <= 0:
+        raise ValueError("Nakładanie musi być krótsze niż długość chunku")
+    if total_samples <= 0:
+        return 0
+    return 1 + max(0, math.ceil((total_samples - chunk_samples) / step_samples))
+
+
+def quick_hash(path: Path, block_size: int = 1024 * 1024) -> str:
+    """Hash z rozmiaru oraz pierwszego i ostatniego MB - wystarcza do wykrycia zmian, a nie czyta całego pliku"""
+    size = path.stat().st_size
+    h = hashlib.sha1(str(size).encode())
+    with open(path, 'rb') as f:
+        h.update(f.read(block_size))
+        if size > block_size:
+            f.seek(max(size - block_size, block_size))
+            h.update(f.read(block_size))
+    return h.hexdigest()
+
+
+def probe_media(path: Path, ffprobe: str = None) -> dict:
+    """
+    Czyta metadane pierwszego strumienia audio przez ffprobe (bez dekodowania).
+    
+    Raises:
+        ValueError: plik nie ma strumienia audio albo ffprobe nie podał długości
+        RuntimeError: nie znaleziono ffprobe
+    """
+    ffprobe = ffprobe or get_ffmpeg_path('ffprobe')
+    try:
+        result = subprocess.run(
+            [ffprobe, "-v", "error", "-select_streams", "a:0",
+             "-show_entries", "stream=codec_name,sample_rate,channels,duration:format=duration",
+             "-of", "json", str(path)],
+            capture_output=True,
+            check=True
+        )
+    except FileNotFoundError:
+        raise RuntimeError(f"Nie znaleziono ffprobe: {ffprobe}")
+    info = json.loads(result.stdout)
+    if not info.get("streams"):
+        raise ValueError(f"Brak strumienia audio: {path}")
+    stream = info["streams"][0]
+    
+    duration = None
+    for value in (stream.get("duration"), info.get("format", {}).get("duration")):
+        if value not in (None, "N/A"):
+            duration = float(value)
+            break
+    if duration is None:
+        raise ValueError(f"ffprobe nie podał długości: {path}")
+    if stream.get("sample_rate") in (None, "N/A"):
+        raise ValueError(f"ffprobe nie podał sample rate: {path}")
+    
+    return {
+        "duration": duration,
+        "codec": stream.get("codec_name"),
+        "sample_rate": int(stream["sample_rate"]),
+        "channels": stream.get("channels"),
+    }
+
+
+def probe_audio(input_file: Path, chunk_duration_minutes: int = 10, overlap_minutes: int = 1):
+    """Zwraca (total_samples, sr) z katalogu mediów - bez dekodowania pliku"""
+    catalog = MediaCatalog()
+    try:
+        info = catalog.lookup(input_file, chunk_duration_minutes, overlap_minutes)
+    finally:
+        catalog.close()
+    return int(round(info["duration"] * info["sample_rate"])), info["sample_rate"]
+
+
+class MediaCatalog:
+    """
+    Lokalny katalog (SQLite) z metadanymi plików audio.
+
+    Plik jest ponownie sprawdzany przez ffprobe tylko wtedy, gdy zmienił się
+    jego rozmiar/mtime i hash - niezmienione pliki kosztują jeden stat().
+    """
+
+    def __init__(self, db_path: Path = DEFAULT_DB, ffprobe: str = None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ffprobe = ffprobe or get_ffmpeg_path('ffprobe')
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def lookup(self, path: Path, chunk_duration: int = 10, overlap: int = 1) -> dict:
+        """Zwraca metadane pliku, odświeżając wpis tylko jeśli plik się zmienił"""
+        path = Path(path).resolve()
+        stat = path.stat()
+        row = self.conn.execute("SELECT * FROM media WHERE path = ?", (str(path),)).fetchone()
+
+        if row is not None and row["size"] == stat.st_size and row["mtime_ns"] == stat.st_mtime_ns:
+            info = dict(row)
+        else:
+            file_hash = quick_hash(path)
+            if row is not None and row["hash"] == file_hash:
+                # Zmienił się tylko mtime (np. kopia) - metadane są aktualne
+                info = dict(row)
+            else:
+                info = probe_media(path, self.ffprobe)
+                info["hash"] = file_hash
+            info.update(path=str(path), size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            info.update(chunk_duration=None, overlap=None)
+            info["probed_at"] = time.time()
+
+        if info["chunk_duration"] != chunk_duration or info["overlap"] != overlap:
+            total_samples = int(round(info["duration"] * info["sample_rate"]))
+            info.update(
+                chunk_duration=chunk_duration,
+                overlap=overlap,
+                expected_chunks=expected_chunk_count(total_samples, info["sample_rate"], chunk_duration, overlap),
+            )
+            self._save(info)
+
+        return info
+
+    def refresh_dir(self, directory: Path, chunk_duration: int = 10, overlap: int = 1,
+                    recursive: bool = True) -> list:
+        """
+        Odświeża katalog dla wszystkich plików audio w folderze i usuwa wpisy
+        plików, których już nie ma. Pliki, których nie da się odczytać, są pomijane;
+        brak ffprobe (RuntimeError) przerywa skanowanie.
+        """
+        directory = Path(directory).resolve()
+        pattern = "**/*" if recursive else "*"
+        files = sorted(p for p in directory.glob(pattern) if p.suffix.lower() in MEDIA_EXTENSIONS and p.is_file())
+
+        infos = []
+        for path in files:
+            try:
+                infos.append(self.lookup(path, chunk_duration, overlap))
+            except (subprocess.CalledProcessError, ValueError, FileNotFoundError) as e:
+                print(f"❌ Nie udało się odczytać: {path} ({e})")
+
+        # Usuń wpisy plików, które zniknęły z folderu
+        existing = {str(p) for p in files}
+        prefix = str(directory)
+        rows = self.conn.execute(
+            "SELECT path FROM media WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+        ).fetchall()
+        for row in rows:
+            if row["path"] not in existing and not Path(row["path"]).exists():
+                self.conn.execute("DELETE FROM media WHERE path = ?", (row["path"],))
+
+        self.conn.commit()
+        return infos
+
+    def _save(self, info: dict):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO media (path, size, mtime_ns, hash, duration, codec, sample_rate, channels, "
+            "chunk_duration, overlap, expected_chunks, probed_at) "
+            "VALUES (:path, :size, :mtime_ns, :hash, :duration, :codec, :sample_rate, :channels, "
+            ":chunk_duration, :overlap, :expected_chunks, :probed_at)",
+            info
+        )
+        self.conn.commit()
+
+
+def estimate(infos: list, speed: float = DEFAULT_SPEED) -> dict:
+    """Sumaryczna długość, liczba chunków i szacowany czas kodowania"""
+    total_duration = sum(info["duration"] for info in infos)
+    # Nakładanie jest kodowane w dwóch sąsiednich chunkach
+    encoded_sec = sum(
+        info["duration"] + max(info["expected_chunks"] - 1, 0) * info["overlap"] * 60
+        for info in infos
+    )
+    return {
+        "files": len(infos),
+        "duration_sec": total_duration,
+        "chunks": sum(info["expected_chunks"] for info in infos),
+        "encode_sec": encoded_sec / speed,
+    }
+
+
+def main():
+    p = argparse.ArgumentParser(description="Katalog metadanych nagrań (SQLite) do planowania pracy")
+    p.add_argument("command", choices=["scan", "estimate"], help="scan - odśwież i wypisz pliki, estimate - podsumowanie")
+    p.add_argument("directory", help="Folder z nagraniami")
+    p.add_argument("-d", "--duration", type=int, default=10, help="Długość chunku w minutach (domyślnie: 10)")
+    p.add_argument("-ov", "--overlap", type=int, default=1, help="Nakładanie w minutach (domyślnie: 1)")
+    p.add_argument("--speed", type=float, default=DEFAULT_SPEED,
+                   help=f"Szybkość przetwarzania (x czasu rzeczywistego, domyślnie: {DEFAULT_SPEED:g})")
+    p.add_argument("--db", default=str(DEFAULT_DB), help=f"Plik katalogu (domyślnie: {DEFAULT_DB})")
+
+    args = p.parse_args()
+
+    directory = Path(args.directory)
+    if not directory.is_dir():
+        print(f"❌ Folder nie istnieje: {directory}")
+        exit(1)
+
+    catalog = MediaCatalog(Path(args.db))
+    try:
+        infos = catalog.refresh_dir(directory, args.duration, args.overlap)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        exit(1)
+    finally:
+        catalog.close()
+
+    if args.command == "scan":
+        for info in infos:
+            print(f"{Path(info['path']).name}: {info['duration'] / 60:.2f} min, {info['codec']}, "
+                  f"{info['sample_rate']} Hz, {info['channels']} ch, chunków: {info['expected_chunks']}")
+
+    summary = estimate(infos, args.speed)
+    print(f"\nPlików: {summary['files']}, łącznie: {summary['duration_sec'] / 60:.2f} minut")
+    print(f"Przewidywanych chunków: {summary['chunks']}")
+    print(f"Szacowany czas kodowania: {summary['encode_sec'] / 60:.1f} minut (przy {args.speed:g}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+import argparse
+import json
+import os
+import socket
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+from audio_chunker import plan_chunks, chunk_file_name, encode_range
+from media_catalog import probe_audio
+
+
+SHARDS_DIR = ".shards"
+MANIFEST_FILE = "manifest.json"
+
+# Co ile sekund worker odświeża swój plik .lock i po jakim czasie bez odświeżenia
+# inny worker może przejąć shard (np. po awarii maszyny)
+HEARTBEAT_SEC = 30
+DEFAULT_STALE_SEC = 300
+
+
+def load_manifest(output_dir: Path) -> dict:
+    with open(output_dir / SHARDS_DIR / MANIFEST_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def plan_shards(input_file: Path, output_dir: Path, num_shards: int,
+                chunk_duration_minutes: int = 10, overlap_minutes: int = 1, force: bool = False) -> dict:
+    """
+    Dzieli zadanie na niezależne shardy (zakresy numerów chunków).
+
+    Granice chunków pochodzą z tej samej arytmetyki co w chunk_audio, więc
+    nazwy i zakresy plików są identyczne jak przy lokalnym podziale.
+    Manifest trafia do output_dir/.shards/manifest.json - folder musi być
+    na współdzielonym dysku, a input_file dostępny pod tą samą ścieżką na
+    wszystkich maszynach.
+
+    Istniejący plan jest nadpisywany tylko z force=True - wtedy usuwane są
+    też stare pliki .lock i .done, żeby nie dotyczyły nowych shardów.
+    """
+    shards_dir = output_dir / SHARDS_DIR
+    if (shards_dir / MANIFEST_FILE).exists() and not force:
+        raise FileExistsError(f"Plan już istnieje: {shards_dir / MANIFEST_FILE}")
+
+    total_samples, sr = probe_audio(input_file, chunk_duration_minutes, overlap_minutes)
+    chunks = plan_chunks(total_samples, sr, chunk_duration_minutes, overlap_minutes)
+    if not chunks:
+        raise ValueError(f"Plik nie zawiera audio, nie ma czego dzielić: {input_file}")
+
+    num_shards = max(1, min(num_shards, len(chunks)))
+    per_shard, extra = divmod(len(chunks), num_shards)
+
+    shards = []
+    first = 0
+    for shard_id in range(num_shards):
+        count = per_shard + (1 if shard_id < extra else 0)
+        shards.append({"id": shard_id, "chunks": [c[0] for c in chunks[first:first + count]]})
+        first += count
+
+    manifest = {
+        "input_file": str(Path(input_file).resolve()),
+        "sample_rate": sr,
+        "total_samples": total_samples,
+        "chunks": [
+            {"number": number, "start_sample": start, "end_sample": end,
+             "file": chunk_file_name(number, start, end, sr)}
+            for number, start, end in chunks
+        ],
+        "shards": shards,
+    }
+
+    shards_dir.mkdir(parents=True, exist_ok=True)
+    for old_file in list(shards_dir.glob("shard_*.lock")) + list(shards_dir.glob("shard_*.done")):
+        old_file.unlink()
+    tmp_file = shards_dir / (MANIFEST_FILE + ".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_file, shards_dir / MANIFEST_FILE)
+
+    return manifest
+
+
+def _lock_file(output_dir: Path, shard_id: int) -> Path:
+    return output_dir / SHARDS_DIR / f"shard_{shard_id:03d}.lock"
+
+
+def _done_file(output_dir: Path, shard_id: int) -> Path:
+    return output_dir / SHARDS_DIR / f"shard_{shard_id:03d}.done"
+
+
+def _take_over_stale_lock(lock_file: Path, stale_sec: float, worker_id: str) -> bool:
+    """
+    Usuwa plik .lock, którego właściciel nie odświeżał go dłużej niż stale_sec.
+    Zmiana nazwy jest atomowa, więc tylko jeden worker przejmie dany lock.
+    """
+    try:
+        if time.time() - lock_file.stat().st_mtime < stale_sec:
+            return False
+        stale_file = lock_file.with_name(f"{lock_file.name}.stale-{worker_id}")
+        os.rename(lock_file, stale_file)
+    except FileNotFoundError:
+        return False
+
+    # Między sprawdzeniem a zmianą nazwy ktoś mógł założyć nowy lock - wtedy go oddajemy
+    if time.time() - stale_file.stat().st_mtime < stale_sec:
+        try:
+            os.link(stale_file, lock_file)
+        except FileExistsError:
+            pass
+        stale_file.unlink()
+        return False
+
+    owner = stale_file.read_text(encoding='utf-8').split('\n', 1)[0]
+    stale_file.unlink()
+    print(f"⚠️ Przejmuję porzucony shard {lock_file.name} (poprzednio: {owner})")
+    return True
+
+
+def claim_shard(output_dir: Path, manifest: dict, worker_id: str, stale_sec: float = DEFAULT_STALE_SEC):
+    """
+    Przejmuje pierwszy wolny shard tworząc plik .lock (O_EXCL - atomowo,
+    także na dysku sieciowym). Lock nieodświeżany dłużej niż stale_sec
+    (awaria workera) może zostać przejęty. Zwraca shard albo None, jeśli
+    nic nie zostało.
+    """
+    for shard in manifest["shards"]:
+        if _done_file(output_dir, shard["id"]).exists():
+            continue
+        lock_file = _lock_file(output_dir, shard["id"])
+        try:
+            fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if not _take_over_stale_lock(lock_file, stale_sec, worker_id):
+                continue
+            try:
+                fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                continue
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(f"{worker_id}\n{time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        return shard
+    return None
+
+
+def _owns_lock(lock_file: Path, worker_id: str):
+    """
+    True/False - czy lock należy do tego workera; None, jeśli pliku chwilowo
+    nie ma (inny worker właśnie sprawdza, czy lock jest porzucony).
+    """
+    try:
+        return lock_file.read_text(encoding='utf-8').split('\n', 1)[0] == worker_id
+    except FileNotFoundError:
+        return None
+
+
+def _heartbeat(lock_file: Path, worker_id: str, stop: threading.Event, lost: threading.Event):
+    """Odświeża mtime pliku .lock, dopóki shard jest przetwarzany i lock jest nasz"""
+    while not stop.wait(HEARTBEAT_SEC):
+        owns = _owns_lock(lock_file, worker_id)
+        if owns is None:
+            continue
+        if not owns:
+            lost.set()
+            return
+        try:
+            os.utime(lock_file)
+        except FileNotFoundError:
+            pass
+
+
+def run_worker(output_dir: Path, worker_id: str = None, ffmpeg: str = None,
+               stale_sec: float = DEFAULT_STALE_SEC) -> int:
+    """
+    Przetwarza shardy, dopóki są wolne. Każdy chunk jest kodowany wprost
+    z pliku wejściowego (seek po wejściu), bez ładowania całego nagrania.
+    Przy błędzie lock i niedokończony plik są usuwane, więc shard może
+    wziąć inny worker. Jeśli shard został przejęty (worker stał dłużej niż
+    stale_sec), worker porzuca go bez ruszania cudzego locka i plików.
+
+    Returns:
+        Liczba przetworzonych shardów
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    manifest = load_manifest(output_dir)
+    chunks = {c["number"]: c for c in manifest["chunks"]}
+    input_file = Path(manifest["input_file"])
+    sr = manifest["sample_rate"]
+    processed = 0
+
+    while True:
+        shard = claim_shard(output_dir, manifest, worker_id, stale_sec)
+        if shard is None:
+            break
+
+        print(f"[{worker_id}] Shard {shard['id']}: chunki {shard['chunks'][0]}-{shard['chunks'][-1]}")
+
+        lock_file = _lock_file(output_dir, shard["id"])
+        stop = threading.Event()
+        lost = threading.Event()
+        heartbeat = threading.Thread(target=_heartbeat, args=(lock_file, worker_id, stop, lost), daemon=True)
+        heartbeat.start()
+        part_file = None
+        try:
+            for number in shard["chunks"]:
+                chunk = chunks[number]
+                output_file = output_dir / chunk["file"]
+                # Kodujemy do własnego pliku tymczasowego, żeby niedokończony chunk nie wyglądał na gotowy
+                # i żeby dwa workery nigdy nie pisały do tego samego pliku
+                part_file = output_file.with_name(f"{output_file.stem}.part-{worker_id}.mp4")
+                try:
+                    encode_range(input_file, part_file, chunk["start_sample"], chunk["end_sample"], sr, ffmpeg)
+                except subprocess.CalledProcessError:
+                    print(f"❌ Błąd konwersji: {output_file}")
+                    return processed
+                if lost.is_set() or _owns_lock(lock_file, worker_id) is False:
+                    lost.set()
+                    print(f"⚠️ Shard {shard['id']} przejął inny worker - porzucam go")
+                    break
+                os.replace(part_file, output_file)
+                part_file = None
+                duration_chunk = (chunk["end_sample"] - chunk["start_sample"]) / (sr * 60)
+                print(f"✓ {output_file.name} ({duration_chunk:.2f} min)")
+            else:
+                if _owns_lock(lock_file, worker_id) is not False:
+                    _done_file(output_dir, shard["id"]).write_text(worker_id + "\n", encoding='utf-8')
+                    processed += 1
+                else:
+                    lost.set()
+        finally:
+            stop.set()
+            heartbeat.join()
+            if part_file is not None and part_file.exists():
+                part_file.unlink()
+            if not lost.is_set() and _owns_lock(lock_file, worker_id):
+                try:
+                    lock_file.unlink()
+                except FileNotFoundError:
+                    pass
+
+    return processed
+
+
+def finalize(output_dir: Path) -> bool:
+    """Sprawdza, czy wszystkie chunk_NNN z manifestu są gotowe"""
+    manifest = load_manifest(output_dir)
+
+    missing = [c["file"] for c in manifest["chunks"]
+               if not (output_dir / c["file"]).exists() or (output_dir / c["file"]).stat().st_size == 0]
+    unfinished = [s["id"] for s in manifest["shards"] if not _done_file(output_dir, s["id"]).exists()]
+
+    if missing or unfinished:
+        if unfinished:
+            print(f"❌ Niedokończone shardy: {', '.join(str(i) for i in unfinished)}")
+        for name in missing:
+            print(f"❌ Brak chunku: {name}")
+        return False
+
+    print(f"✅ Gotowe! Wszystkie {len(manifest['chunks'])} chunki w folderze: {output_dir}")
+    return True
+
+
+def main():
+    p = argparse.ArgumentParser(description="Podział jednego nagrania na chunki na wielu maszynach (wspólny dysk)")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    plan_p = sub.add_parser("plan", help="Zaplanuj shardy i zapisz manifest")
+    plan_p.add_argument("input_file", help="Ścieżka do pliku audio (MP3 lub MP4)")
+    plan_p.add_argument("-o", "--out", default="chunks", help="Folder docelowy (domyślnie: chunks)")
+    plan_p.add_argument("-n", "--shards", type=int, default=8, help="Liczba shardów (domyślnie: 8)")
+    plan_p.add_argument("-d", "--duration", type=int, default=10, help="Długość chunku w minutach (domyślnie: 10)")
+    plan_p.add_argument("-ov", "--overlap", type=int, default=1, help="Nakładanie w minutach (domyślnie: 1)")
+    plan_p.add_argument("--force", action="store_true", help="Nadpisz istniejący plan (usuwa stare locki i znaczniki)")
+
+    work_p = sub.add_parser("work", help="Przetwarzaj wolne shardy")
+    work_p.add_argument("-o", "--out", default="chunks", help="Folder docelowy (domyślnie: chunks)")
+    work_p.add_argument("--worker-id", default=None, help="Identyfikator workera (domyślnie: host-pid)")
+    work_p.add_argument("--stale-after", type=int, default=DEFAULT_STALE_SEC,
+                        help=f"Po ilu sekundach bez odświeżenia lock uznać za porzucony (domyślnie: {DEFAULT_STALE_SEC})")
+
+    final_p = sub.add_parser("finalize", help="Sprawdź, czy wszystkie chunki są gotowe")
+    final_p.add_argument("-o", "--out", default="chunks", help="Folder docelowy (domyślnie: chunks)")
+
+    args = p.parse_args()
+    output_path = Path(args.out)
+
+    if args.command == "plan":
+        input_path = Path(args.input_file)
+        if not input_path.exists():
+            print(f"❌ Plik nie istnieje: {input_path}")
+            exit(1)
+        try:
+            manifest = plan_shards(input_path, output_path, args.shards, args.duration, args.overlap, args.force)
+        except FileExistsError as e:
+            print(f"❌ {e} (użyj --force, żeby zaplanować od nowa)")
+            exit(1)
+        except (RuntimeError, ValueError) as e:
+            print(f"❌ {e}")
+            exit(1)
+        print(f"Zaplanowano {len(manifest['chunks'])} chunków w {len(manifest['shards'])} shardach: {output_path}")
+    elif args.command == "work":
+        processed = run_worker(output_path, args.worker_id, stale_sec=args.stale_after)
+        print(f"Przetworzono shardów: {processed}")
+    else:
+        if not finalize(output_path):
+            exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
+import os
 import re
+import json
+from bisect import bisect_left, bisect_right
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 
 class SRTEntry:
@@ -61,9 +64,34 @@ def parse_srt(file_path: str) -> List[SRTEntry]:
     return entries
 
 
+def load_time_map(file_path: str) -> List[List[int]]:
+    """Wczytaj mapę czasu (time_map.json) zapisaną przez Audio Chunker"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)["segments"]
+
+
+def remap_ms(ms: int, segments: List[List[int]], compact_starts: Optional[List[int]] = None,
+             is_end: bool = False) -> int:
+    """
+    Przelicz czas skompaktowany (bez ciszy) na czas oryginalnego nagrania.
+    
+    segments to lista punktów [compact_ms, original_ms] posortowana po
+    compact_ms; między punktami czas płynie 1:1. Koniec wpisu leżący
+    dokładnie na granicy (is_end=True) zostaje w poprzednim segmencie,
+    żeby napis nie obejmował wyciętej ciszy.
+    """
+    if compact_starts is None:
+        compact_starts = [compact for compact, _ in segments]
+    bisect = bisect_left if is_end else bisect_right
+    i = max(bisect(compact_starts, ms) - 1, 0)
+    compact, original = segments[i]
+    return original + ms - compact
+
+
 def merge_srt_files(
     files: List[Tuple[str, int, int]],  # [(path, chunk_duration_min, overlap_min), ...]
-    output_file: str
+    output_file: str,
+    time_map: Optional[str] = None
 ) -> str:
     """
     Merge SRT files z obsługą nakładania.
@@ -71,6 +99,8 @@ def merge_srt_files(
     Args:
         files: Lista tupli (path, chunk_duration_min, overlap_min)
         output_file: Ścieżka do wyjściowego pliku
+        time_map: Opcjonalna ścieżka do time_map.json - jeśli chunki powstały
+            z wyciętą ciszą, czasy są przeliczane na oryginalne nagranie
     
     Returns:
         Komunikat statusu
@@ -116,11 +146,139 @@ def merge_srt_files(
         # Następny plik zaczyna się (chunk_duration - overlap) minut później
         time_offset += (chunk_ms - overlap_ms)
     
+    # Przelicz czasy z osi bez ciszy na oryginalne nagranie
+    if time_map:
+        segments = load_time_map(time_map)
+        compact_starts = [compact for compact, _ in segments]
+        for entry in all_entries:
+            entry.start = entry.ms_to_time(remap_ms(entry.get_start_ms(), segments, compact_starts))
+            entry.end = entry.ms_to_time(remap_ms(entry.get_end_ms(), segments, compact_starts, is_end=True))
+    
     # Zapisz wynik
     with open(output_file, 'w', encoding='utf-8') as f:
         for entry in all_entries:
-            f.write(f"{entry.index}\n")
-            f.write(f"{entry.start} --> {entry.end}\n")
-            f.write(f"{entry.text}\n\n")
+            f.write(format_entry(entry))
     
     return f"✅ Wygenerowano transkrypcję: {output_file}\nŁącznie wpisów: {len(all_entries)}"
+
+
+def format_entry(entry: SRTEntry) -> str:
+    """Blok SRT dla jednego wpisu (z pustą linią na końcu)"""
+    return f"{entry.index}\n{entry.start} --> {entry.end}\n{entry.text}\n\n"
+
+
+def append_state_file(output_file: str) -> str:
+    """Ścieżka do pliku stanu trybu dopisywania (obok pliku wyjściowego)"""
+    return output_file + ".state.json"
+
+
+def append_srt_file(
+    file_path: str,
+    chunk_duration: int,
+    overlap: int,
+    output_file: str,
+    time_map: Optional[str] = None
+) -> str:
+    """
+    Dopisz jeden kolejny plik SRT do scalanej transkrypcji (tryb na żywo).
+    
+    Wynik jest taki sam jak z merge_srt_files dla tej samej listy plików,
+    ale każde wywołanie parsuje tylko nowy plik. Obok wyjścia trzymany jest
+    mały plik stanu (<output>.state.json): kolejny numer wpisu, offset
+    czasowy i "ogon" - wpisy, które mogą jeszcze wypaść przez nakładanie.
+    Plik wyjściowy jest przycinany w miejscu początku ogona i dopisywany,
+    więc koszt aktualizacji nie rośnie z długością transkrypcji. Jeśli
+    pliku stanu nie ma, transkrypcja zaczyna się od nowa.
+    
+    Args:
+        file_path: Ścieżka do kolejnego pliku SRT
+        chunk_duration: Długość chunku w minutach
+        overlap: Nakładanie w minutach
+        output_file: Ścieżka do wyjściowego pliku
+        time_map: Opcjonalna ścieżka do time_map.json (jak w merge_srt_files)
+    
+    Returns:
+        Komunikat statusu
+    """
+    entries = parse_srt(file_path)
+    
+    if not entries:
+        return f"❌ Błąd: plik {file_path} jest pusty lub nie parsuje się prawidłowo"
+    
+    state_file = append_state_file(output_file)
+    if os.path.exists(state_file):
+        with open(state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    else:
+        state = {"next_index": 1, "time_offset": 0, "tail_offset": 0, "count": 0, "last_start": None, "tail": []}
+    
+    tail = [SRTEntry(*fields) for fields in state["tail"]]
+    entry_index = state["next_index"]
+    time_offset = state["time_offset"]
+    count = state["count"] - len(tail)
+    
+    chunk_ms = chunk_duration * 60 * 1000
+    overlap_ms = overlap * 60 * 1000
+    
+    # Usuń wpisy z okresu nakładania - tak samo jak w merge_srt_files.
+    # Wpisy sprzed ogona kończą się przed offsetem poprzedniego pliku, więc
+    # zawsze przechodzą ten filtr.
+    if state["last_start"] is not None and overlap_ms > 0:
+        cutoff_time = state["last_start"] + chunk_ms - overlap_ms
+        tail = [e for e in tail if e.get_end_ms() <= cutoff_time]
+    
+    for entry in entries:
+        tail.append(SRTEntry(
+            index=entry_index,
+            start=entry.ms_to_time(entry.get_start_ms() + time_offset),
+            end=entry.ms_to_time(entry.get_end_ms() + time_offset),
+            text=entry.text
+        ))
+        entry_index += 1
+    
+    # Nowy ogon zaczyna się od pierwszego wpisu kończącego się po offsecie
+    # tego pliku - wszystko przed nim jest już ostateczne
+    keep_from = next(i for i, e in enumerate(tail) if e.get_end_ms() > time_offset or i == len(tail) - 1)
+    
+    if time_map:
+        segments = load_time_map(time_map)
+        compact_starts = [compact for compact, _ in segments]
+    
+    tail_offset = state["tail_offset"]
+    new_tail_offset = tail_offset
+    blocks = []
+    for i, entry in enumerate(tail):
+        if time_map:
+            entry = SRTEntry(
+                entry.index,
+                entry.ms_to_time(remap_ms(entry.get_start_ms(), segments, compact_starts)),
+                entry.ms_to_time(remap_ms(entry.get_end_ms(), segments, compact_starts, is_end=True)),
+                entry.text
+            )
+        # Te same końce linii co w trybie tekstowym merge_srt_files
+        block = format_entry(entry).replace('\n', os.linesep).encode('utf-8')
+        if i < keep_from:
+            new_tail_offset += len(block)
+        blocks.append(block)
+    
+    if os.path.exists(state_file) and not os.path.exists(output_file):
+        return f"❌ Błąd: brak pliku wyjściowego {output_file} dla zapisanego stanu"
+    with open(output_file, 'r+b' if os.path.exists(state_file) else 'wb') as f:
+        f.seek(tail_offset)
+        f.truncate()
+        f.write(b''.join(blocks))
+    
+    state = {
+        "next_index": entry_index,
+        "time_offset": time_offset + (chunk_ms - overlap_ms),
+        "tail_offset": new_tail_offset,
+        "count": count + len(tail),
+        "last_start": tail[-1].get_start_ms(),
+        "tail": [[e.index, e.start, e.end, e.text] for e in tail[keep_from:]],
+    }
+    tmp_state_file = state_file + ".tmp"
+    with open(tmp_state_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_state_file, state_file)
+    
+    return f"✅ Dopisano {Path(file_path).name} do transkrypcji: {output_file}\nŁącznie wpisów: {state['count']}"